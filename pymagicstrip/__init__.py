@@ -3,60 +3,80 @@
 from __future__ import annotations
 
 import asyncio
+from bisect import bisect_right
 from dataclasses import dataclass, replace
 import logging
 import re
 from typing import Any
 
-from bleak import BleakClient
+from bleak import BleakClient, BleakScanner
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 from bleak.exc import BleakError
 
 from . import const
-from .const import CHARACTERISTIC_UUID, CMD_ACK, EFFECTS, TOGGLE_POWER
+from .const import (
+    CHARACTERISTIC_UUID,
+    CMD_ACK,
+    EFFECTS,
+    EFFECTS_BYTES,
+    TOGGLE_POWER_BYTES,
+)
 from .errors import BleConnectionError, BleTimeoutError, OutOfRange
 
 __version__ = "0.1.1"
 
 _LOGGER = logging.getLogger(__name__)
-_LOGGER.setLevel(logging.DEBUG)
 
-# handler = logging.StreamHandler()
-# formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-# handler.setFormatter(formatter)
-# _LOGGER.addHandler(handler)
+# Status message: 0F WW XX YY ZZ (see _onoff_notification_handler). Matched against
+# raw notification bytes so the hot path skips hex encoding.
+_STATUS_RE = re.compile(rb"\x0f([\x00\x01])(.).(.)", re.DOTALL)
+_CMD_ACK_BYTES = bytes.fromhex(CMD_ACK)
+_ADDRESS_RE = re.compile(const.ADDRESS_REGEX)
+
+# Some Bluetooth stacks reject many simultaneous scans.
+_MAX_CONCURRENT_SCANS = 4
+
+# Directed probes are retried in case advertisements are missed.
+_PROBE_ATTEMPTS = 3
+_PROBE_TIMEOUT_S = 1.5
+
+# Writes failing with OSError are retried with exponential backoff.
+_WRITE_ATTEMPTS = 3
+_WRITE_BACKOFF_S = 0.05
+
+# Lower bounds (dBm) of each RSSI label above "Terrible", ascending.
+_RSSI_THRESHOLDS = (-85, -75, -55)
+_RSSI_LABELS = ("Terrible", "Bad", "Good", "Excellent")
+
+# Trigger written after every command, and the status query used by update().
+_F0 = b"\xf0"
+_STATUS_QUERY = b"\x0f"
 
 
 def device_filter(device: BLEDevice, advertisement_data: AdvertisementData) -> bool:
     """Bleak discovery notification device filter."""
 
-    if device.name.lower() in [
-        d.lower() for d in const.HARDCODED_NAMES
-    ] and const.SERVICE_UUID in device.metadata.get("uuids", []):
-        return True
+    return (
+        _name_matches(device)
+        and const.SERVICE_UUID in advertisement_data.service_uuids
+    )
+
+
+def _name_matches(device: BLEDevice) -> bool:
+    """Check advertised name against known device names."""
 
-    return False
+    return device.name is not None and device.name.lower() in const.HARDCODED_NAMES_LC
 
 
 def _judge_rssi(rssi: int | None) -> str | None:
     """Return qualatative assessment of RSSI."""
 
-    if rssi is None:
+    # Valid RSSI is negative; zero or positive readings are scanner errors.
+    if rssi is None or rssi >= 0:
         return None
 
-    if rssi >= 0:
-        return "Unknown"
-    if rssi >= -55:
-        return "Excellent"
-    if rssi >= -75:
-        return "Good"
-    if rssi >= -85:
-        return "Bad"
-    if rssi < -85:
-        return "Terrible"
-
-    return None
+    return _RSSI_LABELS[bisect_right(_RSSI_THRESHOLDS, rssi)]
 
 
 @dataclass(frozen=True)
@@ -69,7 +89,6 @@ class MagicStripState:
     effect: str | None = None
     effect_speed: int | None = None
     rssi: int | None = None
-    event = asyncio.Event()
 
     def replace_from_notification(
         self, on: bool, brightness: int, **changes: Any
@@ -94,18 +113,54 @@ class MagicStripState:
 class MagicStripDevice:
     """Communication handler."""
 
-    def __init__(self, device: BLEDevice | str) -> None:
-        """Initialize handler."""
+    def __init__(
+        self,
+        device: BLEDevice | str,
+        keepalive_s: float = 30.0,
+        combine_writes: bool = False,
+    ) -> None:
+        """Initialize handler.
+
+        The connection is held open for keepalive_s seconds after the last command
+        so that bursts of commands don't reconnect each time. Set to 0 to disconnect
+        immediately. Leaving the context does not disconnect while keepalive is
+        enabled; call disconnect() before the event loop closes.
+
+        combine_writes sends each command and its F0 trigger as a single write.
+        Only enable it for devices known to accept the concatenated payload; a
+        device that ignores it reports no error.
+        """
+        if isinstance(device, str) and _ADDRESS_RE.match(device) is None:
+            raise OutOfRange(f"Invalid device address: {device}")
+
         self.ble_device = device
         self.state = MagicStripState()
-        self.lock = asyncio.Lock()
+        # Guards the connection refcount only; never held across GATT I/O.
+        self._conn_lock = asyncio.Lock()
+        # Keeps a command and its F0 trigger from interleaving with other writes.
+        self._write_lock = asyncio.Semaphore(1)
+        # Serializes update() notify sessions; kept apart so writes don't wait on it.
+        self._update_lock = asyncio.Lock()
         self._client = BleakClient(self.ble_device)
         self._client_count = 0
+        self._keepalive_s = keepalive_s
+        self._disconnect_handle: asyncio.TimerHandle | None = None
+        self._disconnect_task: asyncio.Task | None = None
+        # Send command and F0 trigger as one write. Opt-in; see docstring.
+        self._combine_writes = combine_writes
+        # Set by the notification handler when a status message arrives.
+        self._notify_event = asyncio.Event()
+        # Advertisement-triggered refreshes are limited to one per interval.
+        self._last_update_at = 0.0
+        self._update_interval_s = 30.0
+        self._update_task: asyncio.Task | None = None
 
     async def __aenter__(self) -> MagicStripDevice:
         """Enter context."""
-        async with self.lock:
+        async with self._conn_lock:
             if self._client_count == 0:
+                self._cancel_disconnect()
+            if self._client_count == 0 and not self._client.is_connected:
                 try:
                     await self._client.__aenter__()
                 except (asyncio.TimeoutError, asyncio.exceptions.TimeoutError) as exc:
@@ -122,10 +177,43 @@ class MagicStripDevice:
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore
         """Exit context."""
-        async with self.lock:
+        async with self._conn_lock:
             self._client_count -= 1
             if self._client_count == 0:
-                await self._client.__aexit__(exc_type, exc_val, exc_tb)
+                if self._keepalive_s > 0:
+                    self._disconnect_handle = asyncio.get_running_loop().call_later(
+                        self._keepalive_s, self._start_deferred_disconnect
+                    )
+                else:
+                    await self._client.__aexit__(exc_type, exc_val, exc_tb)
+
+    def _cancel_disconnect(self) -> None:
+        """Cancel pending keepalive disconnect."""
+        if self._disconnect_handle is not None:
+            self._disconnect_handle.cancel()
+            self._disconnect_handle = None
+
+    def _start_deferred_disconnect(self) -> None:
+        """Start disconnect task once keepalive expires."""
+        self._disconnect_handle = None
+        self._disconnect_task = asyncio.create_task(self._deferred_disconnect())
+
+    async def _deferred_disconnect(self) -> None:
+        """Disconnect if no one has reentered context since keepalive was scheduled."""
+        async with self._conn_lock:
+            if self._client_count == 0 and self._disconnect_handle is None:
+                _LOGGER.debug("Keepalive expired. Disconnecting.")
+                try:
+                    await self._client.disconnect()
+                except BleakError:
+                    _LOGGER.debug("Deferred disconnect failed", exc_info=True)
+
+    async def disconnect(self) -> None:
+        """Close idle connection without waiting for keepalive to expire."""
+        async with self._conn_lock:
+            self._cancel_disconnect()
+            if self._client_count == 0 and self._client.is_connected:
+                await self._client.disconnect()
 
     async def _onoff_notification_handler(self, sender, data) -> None:  # type: ignore
         """Handle HCI event notifications."""
@@ -146,34 +234,36 @@ class MagicStripDevice:
         ZZ useless.
         """
 
+        if data[:3] == _CMD_ACK_BYTES:
+            _LOGGER.debug("Got status ack.")
+            return
+
         status_components: re.Match | None
-        if (
-            status_components := re.search(
-                const.STATUS_REGEX, status_str := bytearray.hex(data)
-            )
-        ) is not None:
+        if (status_components := _STATUS_RE.fullmatch(data)) is not None:
 
-            on = status_components.group(1) == "01"
-            brightness = int(status_components.group(2), 16)
+            on = status_components.group(1)[0] == 1
+            brightness = status_components.group(2)[0]
 
             self.state = self.state.replace_from_notification(
                 on=on, brightness=brightness
             )
 
-            _LOGGER.debug(
-                "%s: Device status reported as %s. On: %s, Brightness: %s",
-                self.address,
-                bytearray.hex(data),
-                on,
-                brightness,
-            )
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    "%s: Device status reported as %s. On: %s, Brightness: %s",
+                    self.address,
+                    data.hex(),
+                    on,
+                    brightness,
+                )
 
-            _LOGGER.debug("New state: %s", str(self.state))
+                _LOGGER.debug("New state: %s", self.state)
+
+            self._notify_event.set()
 
-        elif status_str == CMD_ACK:
-            _LOGGER.debug("Got status ack.")
         else:
-            _LOGGER.debug("Invalid status message: %s", status_str)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Invalid status message: %s", data.hex())
 
     @property
     def address(self) -> str:
@@ -182,39 +272,60 @@ class MagicStripDevice:
             return self.ble_device
         return str(self.ble_device.address)
 
-    async def _send_command(self, cmd: str | list, attempts: int = 1) -> None:
+    async def _write_command(self, cmd: bytes) -> None:
+        """Write command followed by the F0 trigger."""
+
+        if self._combine_writes:
+            try:
+                await self._client.write_gatt_char(
+                    CHARACTERISTIC_UUID, cmd + _F0, response=False
+                )
+                return
+            except BleakError:
+                # Only local errors while connected are surfaced here; the device
+                # never acknowledges a write without response.
+                if not self._client.is_connected:
+                    raise
+                _LOGGER.debug(
+                    "Combined write failed. Falling back to separate writes.",
+                    exc_info=True,
+                )
+                self._combine_writes = False
+
+        await self._client.write_gatt_char(CHARACTERISTIC_UUID, cmd, response=False)
+        await self._client.write_gatt_char(CHARACTERISTIC_UUID, _F0, response=False)
+
+    async def _send_command(self, cmd: bytes | list[bytes]) -> None:
         """Send given command."""
 
-        if isinstance(cmd, list):
-            for cmd_single in cmd:
-                await self._send_command(cmd_single)
-            return
-
-        async with self:
-            async with self.lock:
+        cmds = cmd if isinstance(cmd, list) else [cmd]
+
+        for attempt in range(_WRITE_ATTEMPTS):
+            try:
+                async with self:
+                    async with self._write_lock:
+                        for cmd_single in cmds:
+                            if _LOGGER.isEnabledFor(logging.DEBUG):
+                                _LOGGER.debug("Sending command: %s", cmd_single.hex())
+                            await self._write_command(cmd_single)
+                break
+            except asyncio.TimeoutError as exc:
+                _LOGGER.debug("Timeout on write", exc_info=True)
+                raise BleTimeoutError from exc
+            except BleakError as exc:
+                _LOGGER.debug("Failed to write", exc_info=True)
+                raise BleConnectionError("Failed to write") from exc
+            except OSError:
+                _LOGGER.debug("Encountered OSError.")
+                if attempt == _WRITE_ATTEMPTS - 1:
+                    raise
+                _LOGGER.debug("Assuming connection has been closed. Trying again...")
+                # Drop the link so the next attempt reconnects rather than reusing it.
                 try:
-                    _LOGGER.debug("Sending command: %s", cmd)
-                    await self._client.write_gatt_char(
-                        CHARACTERISTIC_UUID, bytes.fromhex(cmd)
-                    )
-                    await self._client.write_gatt_char(
-                        CHARACTERISTIC_UUID, bytes.fromhex("F0")
-                    )
-                except asyncio.TimeoutError as exc:
-                    _LOGGER.debug("Timeout on write", exc_info=True)
-                    raise BleTimeoutError from exc
-                except BleakError as exc:
-                    _LOGGER.debug("Failed to write", exc_info=True)
-                    raise BleConnectionError("Failed to write") from exc
-                except OSError:
-                    _LOGGER.debug("Encountered OSError.")
-                    if attempts <= 2:
-                        _LOGGER.debug(
-                            "Assuming connection has been closed. Trying again..."
-                        )
-                        self._send_command(cmd, attempts + 1)
-                    else:
-                        raise
+                    await self._client.disconnect()
+                except (BleakError, OSError):
+                    _LOGGER.debug("Failed to disconnect", exc_info=True)
+                await asyncio.sleep(_WRITE_BACKOFF_S * (1 << attempt))
 
         _LOGGER.debug("Command sent.")
 
@@ -234,7 +345,7 @@ class MagicStripDevice:
             if not 0 <= color <= 255:
                 raise OutOfRange
 
-        await self._send_command(f"03{''.join(f'{i:02x}' for i in (red, green, blue))}")
+        await self._send_command(bytes((0x03, red, green, blue)))
 
         self.state = replace(
             self.state, color=(red, green, blue), effect_speed=None, effect=None
@@ -246,12 +357,10 @@ class MagicStripDevice:
         if not 0 <= brightness <= 255:
             raise OutOfRange
 
-        await self._send_command(f"08{''.join(f'{brightness:02x}')}")
+        await self._send_command(bytes((0x08, brightness)))
 
         self.state = replace(self.state, brightness=brightness)
 
-        await self.update()
-
     async def set_effect_name(self, effect: str | None) -> None:
         """Set strip to specified effect."""
 
@@ -259,7 +368,7 @@ class MagicStripDevice:
             raise OutOfRange
 
         if effect is not None:
-            effect_cmd = EFFECTS[effect]
+            effect_cmd = EFFECTS_BYTES[effect]
             await self._send_command(effect_cmd)
 
         self.state = replace(self.state, effect=effect, color=None)
@@ -273,7 +382,7 @@ class MagicStripDevice:
         # Speed is inverted. 0 is fastest; 255 is slowest. Let's keep that to ourselves.
         inv_speed = 255 - speed
 
-        speed_cmd = f"09{inv_speed:02x}"
+        speed_cmd = bytes((0x09, inv_speed))
 
         self.state = replace(self.state, effect_speed=speed)
 
@@ -283,22 +392,37 @@ class MagicStripDevice:
 
     async def toggle_power(self) -> None:
         """Set strip to specified effect."""
-        await self._send_command(TOGGLE_POWER)
-
-        self.state = replace(self.state, on=not self.state.on)
+        await self._send_command(TOGGLE_POWER_BYTES)
 
-        await self.update()
+        # Can't infer the new state from an unknown one; ask the device instead.
+        if self.state.on is None:
+            await self.update()
+        else:
+            self.state = replace(self.state, on=not self.state.on)
 
     async def detection_callback(
         self, device: BLEDevice, advertisement_data: AdvertisementData
     ) -> None:
         """Handle scanner data."""
 
-        self.state = replace(self.state, rssi=device.rssi)
+        self.state = replace(self.state, rssi=advertisement_data.rssi)
 
         _LOGGER.debug("Discovered Device: %s", self.state)
 
-        await self.update()
+        # Never await update() here; that would stall the scanner's dispatch loop.
+        now = asyncio.get_running_loop().time()
+        if now - self._last_update_at > self._update_interval_s and (
+            self._update_task is None or self._update_task.done()
+        ):
+            self._last_update_at = now
+            self._update_task = asyncio.create_task(self._background_update())
+
+    async def _background_update(self) -> None:
+        """Refresh state outside of the scanner callback."""
+        try:
+            await self.update()
+        except (BleConnectionError, BleTimeoutError, OSError):
+            _LOGGER.debug("Background update failed", exc_info=True)
 
     async def update(self) -> None:
         """Query device for current power and brightness states."""
@@ -306,23 +430,27 @@ class MagicStripDevice:
         _LOGGER.debug("Refreshing state.")
 
         async with self:
-            async with self.lock:
+            async with self._update_lock:
                 try:
                     await self._client.start_notify(
                         CHARACTERISTIC_UUID, self._onoff_notification_handler
                     )
 
-                    await self._client.write_gatt_char(
-                        CHARACTERISTIC_UUID, bytes.fromhex("F0")
-                    )
-                    await self._client.write_gatt_char(
-                        CHARACTERISTIC_UUID, bytes.fromhex("0F")
-                    )
+                    self._notify_event.clear()
+
+                    async with self._write_lock:
+                        await self._client.write_gatt_char(CHARACTERISTIC_UUID, _F0)
+                        await self._client.write_gatt_char(
+                            CHARACTERISTIC_UUID, _STATUS_QUERY
+                        )
 
                     # await self._client.write_gatt_descriptor(4, bytes.fromhex("0100"))
 
                     # Give response notification time to come in.
-                    await asyncio.sleep(1)
+                    try:
+                        await asyncio.wait_for(self._notify_event.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        _LOGGER.debug("No status received from device.")
 
                     await self._client.stop_notify(CHARACTERISTIC_UUID)
                 except asyncio.TimeoutError as exc:
@@ -331,3 +459,67 @@ class MagicStripDevice:
                 except BleakError as exc:
                     _LOGGER.debug("Failed to update", exc_info=True)
                     raise BleConnectionError("Failed to update device") from exc
+
+
+async def find_known_devices(addresses: list[str]) -> list[MagicStripDevice]:
+    """Resolve known addresses concurrently. Addresses not found are skipped."""
+
+    semaphore = asyncio.Semaphore(_MAX_CONCURRENT_SCANS)
+
+    async def _find(address: str) -> BLEDevice | None:
+        async with semaphore:
+            return await BleakScanner.find_device_by_address(address)
+
+    results = await asyncio.gather(
+        *(_find(address) for address in addresses), return_exceptions=True
+    )
+
+    devices = []
+    for address, result in zip(addresses, results):
+        if isinstance(result, BLEDevice):
+            devices.append(MagicStripDevice(result))
+        else:
+            _LOGGER.debug("Could not find device %s: %s", address, result)
+
+    return devices
+
+
+async def discover(
+    address: str | None = None, timeout: float = 5.0
+) -> list[MagicStripDevice]:
+    """Discover devices.
+
+    If address is given, probe for it directly before falling back to a broadcast
+    scan.
+    """
+
+    if address is not None:
+        for attempt in range(1, _PROBE_ATTEMPTS + 1):
+            if (
+                device := await BleakScanner.find_device_by_address(
+                    address, timeout=_PROBE_TIMEOUT_S
+                )
+            ) is not None:
+                return [MagicStripDevice(device)]
+            _LOGGER.debug("Probe %s for %s found nothing.", attempt, address)
+
+    found: dict[str, BLEDevice] = {}
+
+    def _detection_callback(
+        device: BLEDevice, advertisement_data: AdvertisementData
+    ) -> None:
+        # Service UUID is already matched by the OS-level scan filter.
+        if _name_matches(device):
+            found[device.address] = device
+
+    async with BleakScanner(
+        detection_callback=_detection_callback,
+        service_uuids=[const.SERVICE_UUID],
+    ):
+        await asyncio.sleep(timeout)
+
+    return [
+        MagicStripDevice(device)
+        for device in found.values()
+        if address is None or device.address.lower() == address.lower()
+    ]
@@ -3,9 +3,15 @@
 SERVICE_UUID = "0000fff0-0000-1000-8000-00805f9b34fb"
 CHARACTERISTIC_UUID = "0000fff1-0000-1000-8000-00805f9b34fb"
 HARDCODED_NAMES = ["HTZM"]
+HARDCODED_NAMES_LC = frozenset(name.lower() for name in HARDCODED_NAMES)
 
 CMD_ACK = "f00201"
-STATUS_REGEX = r"0f(00|01)([A-Za-z-0-9]{2})[A-Za-z-0-9]{2}([A-Za-z-0-9]{2})"
+STATUS_REGEX = r"^0f(00|01)([0-9a-f]{2})[0-9a-f]{2}([0-9a-f]{2})\Z"
+# MAC address (BlueZ, Windows) or UUID (CoreBluetooth on macOS).
+ADDRESS_REGEX = (
+    r"^(?:[0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}$"
+    r"|^[0-9A-Fa-f]{8}-(?:[0-9A-Fa-f]{4}-){3}[0-9A-Fa-f]{12}$"
+)
 
 TOGGLE_POWER = "04"
 
@@ -52,3 +58,7 @@ EFFECTS = {
     "Colorful Strobe": "0728",
     "Automatic": "07F0",
 }
+
+# Wire-encoded commands, built once at import.
+TOGGLE_POWER_BYTES = bytes.fromhex(TOGGLE_POWER)
+EFFECTS_BYTES = {name: bytes.fromhex(cmd) for name, cmd in EFFECTS.items()}